@@ -2,6 +2,10 @@ import torch
 from transformers import T5Tokenizer, T5ForConditionalGeneration
 import os
 import re  # Nécessaire pour la validation sémantique et le nettoyage
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import matplotlib
+matplotlib.use("Agg")  # rendu hors écran : pas de fenêtre, pas de fil GUI
 import schemdraw
 import schemdraw.elements as elm
 import matplotlib.pyplot as pltq
@@ -29,6 +33,13 @@ except OSError:
 device = "cuda" if torch.cuda.is_available() else "cpu"
 model = model.to(device)
 
+# Inférence uniquement : le décodage est limité par la bande passante mémoire,
+# donc FP16 sur GPU divise par deux les octets déplacés par token
+model.eval()
+if device == "cuda":
+    model = model.half()
+    torch.backends.cuda.matmul.allow_tf32 = True
+
 print(f"Modèle chargé avec succès sur {device} !\n")
 
 
@@ -37,57 +48,102 @@ print(f"Modèle chargé avec succès sur {device} !\n")
 # 2. FONCTIONS DE GÉNÉRATION, NETTOYAGE ET VALIDATION
 # ==============================================================================
 
+# Cache prompt -> netlist brute : les poids ne changent pas pendant la session,
+# donc re-soumettre la même description dans le REPL ne coûte rien
+_RESULT_CACHE = {}
+_RESULT_CACHE_MAX = 256
+
 def generate_spice(text_description):
     """
-    Traduit une description textuelle en Netlist SPICE brute.
+    Traduit une ou plusieurs descriptions textuelles en Netlist SPICE brute.
+    Accepte une chaîne (retourne une chaîne) ou une liste (retourne une liste).
     """
+    single = isinstance(text_description, str)
+    prompts = [text_description] if single else list(text_description)
+
+    if single:
+        cached = _RESULT_CACHE.get(text_description)
+        if cached is not None:
+            return cached
+
     # Préparation de l'entrée
     inputs = tokenizer(
-        text_description, 
-        return_tensors="pt", 
-        padding=True, 
-        truncation=True, 
+        prompts,
+        return_tensors="pt",
+        padding=True,
+        truncation=True,
         max_length=512
     ).to(device)
 
     # Génération
-    outputs = model.generate(
-        inputs.input_ids,
-        max_length=200,
-        num_beams=5, 
-        early_stopping=True
-    )
+    # num_beams=4 : le coût du décodeur est proportionnel au nombre de
+    # faisceaux, et 4 suffit pour des netlists aussi courtes
+    with torch.inference_mode():
+        outputs = model.generate(
+            inputs.input_ids,
+            attention_mask=inputs.attention_mask,
+            max_length=200,
+            num_beams=4,
+            early_stopping=True,
+            use_cache=True
+        )
 
     # Décodage
-    result = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    return result
+    results = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+    for prompt, result in zip(prompts, results):
+        if len(_RESULT_CACHE) < _RESULT_CACHE_MAX:
+            _RESULT_CACHE[prompt] = result
+    return results[0] if single else results
+
+# Regex compilées une fois au niveau module : les appels dans les chemins
+# chauds évitent la recherche dans le cache interne de re
+_SPLIT_RE = re.compile(r'\s(?=[RCLVIDQM][0-9]+\s+[0-9])')
+_END_RE = re.compile(r'\.end')
+_BLANK_RE = re.compile(r'\n+')
+_VALUE_FMT_RE = re.compile(r"^\d+(\.\d+)?[a-zA-Z]*$")
 
 def clean_netlist(netlist_text):
     """
     Nettoie la sortie du modèle pour assurer un format SPICE valide (multilignes).
     """
     text = netlist_text.strip()
-    
+
     # 1. Force le saut de ligne avant les composants, MAIS intelligemment.
     # On cherche : Espace + [Lettre][Chiffre] + [Espace] + [Chiffre]
     # Cela garantit qu'on ne coupe pas un nom de modèle comme "D1N4148"
     # Le pattern (?=...) est un "lookahead" : il vérifie la présence sans "manger" le texte
-    text = re.sub(r'\s(?=[RCLVIDQM][0-9]+\s+[0-9])', '\n', text)
+    text = _SPLIT_RE.sub('\n', text)
 
     # 2. Cas spécifique pour les sources/composants qui n'auraient pas été captés
     # Si le regex précédent est trop strict, on s'assure que V, I, R en début de ligne sont propres
     # (Optionnel mais sécurisant)
     
     # 3. Force le saut de ligne avant la commande .end
-    if ".end" in text:
-        text = text.replace(".end", "\n.end")
-        
+    # (une seule passe : le "in" + replace parcouraient la chaîne deux fois)
+    text = _END_RE.sub('\n.end', text)
+
+
     # 4. Supprime les lignes vides et espaces superflus
-    text = re.sub(r'\n+', '\n', text)
+    text = _BLANK_RE.sub('\n', text)
     
     return text.strip()
 # --- Validation Sémantique ---
-VALID_PREFIXES = {"R", "C", "L", "V", "I", "D", "Q", "M", "X"}
+VALID_PREFIXES = frozenset("RCLVIDQMX")
+
+# Dictionnaire de mapping : Lettre SPICE -> Élément Schemdraw
+# Constante de module : construit une seule fois, pas à chaque dessin
+ELEMENT_MAP = {
+    'R': elm.Resistor,
+    'C': elm.Capacitor,
+    'L': elm.Inductor,
+    'V': elm.SourceV,      # Source de tension (ex-SourceDC)
+    'I': elm.SourceI,      # Source de courant
+    'D': elm.Diode,
+    'Q': elm.BjtNpn,       # Transistor Bipolaire NPN (Par défaut)
+    'M': elm.NFet,         # MOSFET N-Channel (Remplacement de Mosfet)
+    'S': elm.SwitchDpst,   # Interrupteur simple (Remplacement de Switch)
+    'X': elm.Dot           # Pour les sous-circuits inconnus
+}
 
 def semantic_validate(net):
     """
@@ -140,7 +196,7 @@ def semantic_validate(net):
                 return False, f"Valeur manquante pour le composant : {line}"
             
             value = parts[3]
-            if not re.match(r"^\d+(\.\d+)?[a-zA-Z]*$", value):
+            if not _VALUE_FMT_RE.match(value):
                 return False, f"Format de valeur invalide : {value}"
 
     # 6. Vérifications globales
@@ -152,6 +208,17 @@ def semantic_validate(net):
 
     return True, "Valide"
 
+# Un seul worker : le dessin du schéma précédent recouvre la génération du
+# suivant sans bloquer le REPL (le backend Agg n'a pas besoin du fil principal)
+_DRAW_POOL = ThreadPoolExecutor(max_workers=1)
+
+def _report_draw_error(future):
+    # Sans ce rappel, une exception levée dans le worker (parsing des
+    # composants, mise en page schemdraw) disparaîtrait avec le Future
+    exc = future.exception()
+    if exc is not None:
+        print(f"Erreur lors du dessin du circuit : {exc!r}")
+
 def draw_circuit(netlist_text):
     """
     Tente de dessiner un circuit fermé (boucle) de manière heuristique.
@@ -174,10 +241,31 @@ def draw_circuit(netlist_text):
         else:
             components.append(parts)
 
+    # --- 2. PRÉ-ASSEMBLER LES ÉLÉMENTS (Droite -> Bas) ---
+    # On instancie tout hors du contexte de dessin : schemdraw refait de la
+    # mise en page à chaque add, autant ne lui donner qu'une rafale d'ajouts
+    elements = []
+    for i, parts in enumerate(components):
+        name = parts[0]
+        type_char = name[0].upper()
+        val = parts[3] if len(parts) > 3 else ""
+        label = f"{name}\n{val}"
+
+        element_class = ELEMENT_MAP.get(type_char, elm.Dot)
+
+        # Logique pour fermer le circuit :
+        # Si c'est le DERNIER composant de la liste, on le dessine vers le BAS
+        is_last = (i == len(components) - 1)
+
+        if is_last:
+            elements.append(element_class(label=label).down())
+        else:
+            elements.append(element_class(label=label).right())
+
     # Configuration du dessin
     with schemdraw.Drawing(show=False) as d:
         d.config(fontsize=12)
-        
+
         # --- 1. DESSINER LA SOURCE (Montée) ---
         if source_line:
             name = source_line[0]
@@ -185,49 +273,21 @@ def draw_circuit(netlist_text):
             source_elt = d.add(elm.SourceV(label=f"{name}\n{val}").up())
         else:
             source_elt = d.add(elm.Dot())
-        # Dictionnaire de mapping : Lettre SPICE -> Élément Schemdraw
-        # On définit ici "les règles" de dessin
-# Dictionnaire de mapping : Lettre SPICE -> Élément Schemdraw
-        mapping = {
-            'R': elm.Resistor,
-            'C': elm.Capacitor,
-            'L': elm.Inductor,
-            'V': elm.SourceV,      # Source de tension (ex-SourceDC)
-            'I': elm.SourceI,      # Source de courant
-            'D': elm.Diode,
-            'Q': elm.BjtNpn,       # Transistor Bipolaire NPN (Par défaut)
-            'M': elm.NFet,         # MOSFET N-Channel (Remplacement de Mosfet)
-            'S': elm.SwitchDpst,   # Interrupteur simple (Remplacement de Switch)
-            'X': elm.Dot           # Pour les sous-circuits inconnus
-        }
-
-   # --- 3. DESSINER LES COMPOSANTS (Droite -> Bas) ---
-        # On parcourt tous les composants sauf le dernier
-        for i, parts in enumerate(components):
-            name = parts[0]
-            type_char = name[0].upper()
-            val = parts[3] if len(parts) > 3 else ""
-            label = f"{name}\n{val}"
-            
-            element_class = mapping.get(type_char, elm.Dot)
-            
-            # Logique pour fermer le circuit :
-            # Si c'est le DERNIER composant de la liste, on le dessine vers le BAS
-            is_last = (i == len(components) - 1)
-            
-            if is_last:
-                d += element_class(label=label).down()
-            else:
-                d += element_class(label=label).right()
+
+        # --- 3. DESSINER LES COMPOSANTS (une seule passe d'ajouts) ---
+        for e in elements:
+            d += e
 
         # --- 4. FERMER LA BOUCLE (Fil de retour) ---
         # On tire un fil depuis la position actuelle jusqu'au début de la source (source_elt.start)
         # .to() permet de tracer une ligne directe vers un point précis
         d += elm.Wire().to(source_elt.start)
 
-        # Affichage
+        # Enregistrement (le backend Agg ne peut pas afficher de fenêtre)
+        outfile = os.path.join(script_dir, f"circuit_{uuid.uuid4().hex[:8]}.png")
         try:
-            d.draw()
+            d.save(outfile)
+            print(f"Schéma enregistré dans {outfile}")
         except Exception as e:
             print(f"Erreur graphique : {e}")
 
@@ -235,30 +295,39 @@ def draw_circuit(netlist_text):
 # 3. ZONE DE TEST INTERACTIVE
 # ==============================================================================
 
+def run_tests(prompts):
+    # Une seule passe de génération pour tous les prompts : le batch amortit
+    # les lancements de kernels et l'allocation du cache KV
+    raw_netlists = generate_spice(list(prompts))
+
+    for prompt, raw_netlist in zip(prompts, raw_netlists):
+        print(f"Input: {prompt}")
+
+        # --- ETAPE DE NETTOYAGE ---
+        netlist = clean_netlist(raw_netlist)
+
+        print("--- SPICE ---")
+        print(netlist)
+
+        # Appel de la validation sur la version nettoyée
+        is_valid, message = semantic_validate(netlist)
+        if is_valid:
+            print(f"✅ Validation : {message}")
+            _DRAW_POOL.submit(draw_circuit, netlist).add_done_callback(_report_draw_error)
+        else:
+            print(f"❌ Validation : {message}")
+        print("-" * 30)
+
 def run_test(prompt):
-    print(f"Input: {prompt}")
-    raw_netlist = generate_spice(prompt)
-    
-    # --- ETAPE DE NETTOYAGE ---
-    netlist = clean_netlist(raw_netlist)
-    
-    print("--- SPICE ---")
-    print(netlist)
-    
-    # Appel de la validation sur la version nettoyée
-    is_valid, message = semantic_validate(netlist)
-    if is_valid:
-        print(f"✅ Validation : {message}")
-        draw_circuit(netlist)
-    else:
-        print(f"❌ Validation : {message}")
-    print("-" * 30)
+    run_tests([prompt])
 
-# Exemple 1 : Circuit simple
-run_test("A circuit with a 9V battery connected to a 1k resistor and a LED.")
+run_tests([
+    # Exemple 1 : Circuit simple
+    "A circuit with a 9V battery connected to a 1k resistor and a LED.",
 
-# Exemple 2 : RLC
-run_test("Series RLC circuit with 12V source, 100 ohm resistor, 1mH inductor and 10uF capacitor.")
+    # Exemple 2 : RLC
+    "Series RLC circuit with 12V source, 100 ohm resistor, 1mH inductor and 10uF capacitor.",
+])
 # ==============================================================================
 # 5. STRESS TESTS : CIRCUITS COMPLEXES & MULTI-ETAGES
 # ==============================================================================
@@ -267,49 +336,41 @@ print("  STRESS TESTS (Circuits Longs & Complexes)")
 print("  Objectif : Voir si le modèle gère > 5 composants")
 print("!"*50 + "\n")
 
-# 1. Double Filtre RC (Cascade)
-# Test : Capacité à enchaîner deux structures identiques (Etage 1 -> Etage 2)
-# Attendu : V1, R1, C1, R2, C2 (5 composants)
-run_test(
+run_tests([
+    # 1. Double Filtre RC (Cascade)
+    # Test : Capacité à enchaîner deux structures identiques (Etage 1 -> Etage 2)
+    # Attendu : V1, R1, C1, R2, C2 (5 composants)
     "Double stage RC low-pass filter with 10V source. "
     "First stage: 1k resistor and 1uF capacitor. "
-    "Second stage: 10k resistor and 100nF capacitor."
-)
-
-# 2. Amplificateur Transistor avec Polarisation (Voltage Divider Bias)
-# Test : Gérer 4 résistances autour d'un transistor (Pont diviseur base + R collecteur + R émetteur)
-# C'est un grand classique, mais lourd pour un petit modèle.
-# Attendu : V1, Q1, R1, R2, R3, R4 (6 composants)
-run_test(
+    "Second stage: 10k resistor and 100nF capacitor.",
+
+    # 2. Amplificateur Transistor avec Polarisation (Voltage Divider Bias)
+    # Test : Gérer 4 résistances autour d'un transistor (Pont diviseur base + R collecteur + R émetteur)
+    # C'est un grand classique, mais lourd pour un petit modèle.
+    # Attendu : V1, Q1, R1, R2, R3, R4 (6 composants)
     "NPN transistor amplifier with voltage divider bias. "
     "12V source, 10k and 2.2k resistors for base biasing, "
-    "1k collector resistor, 470 ohm emitter resistor and 2N3904 transistor."
-)
+    "1k collector resistor, 470 ohm emitter resistor and 2N3904 transistor.",
 
-# 3. Circuit Multi-Branches (Parallèle Hétérogène)
-# Test : Une branche résistive (LED) + Une branche capacitive (Timer/Lissage)
-# Attendu : V1, R1, D1, R2, C1
-run_test(
+    # 3. Circuit Multi-Branches (Parallèle Hétérogène)
+    # Test : Une branche résistive (LED) + Une branche capacitive (Timer/Lissage)
+    # Attendu : V1, R1, D1, R2, C1
     "Circuit with a 9V battery powering two parallel branches. "
     "Branch 1 has a 220 ohm resistor and a D1N4148 diode. "
-    "Branch 2 has a 4.7k resistor and a 100uF capacitor."
-)
+    "Branch 2 has a 4.7k resistor and a 100uF capacitor.",
 
-# 4. Filtre RLC avec Charge (Load)
-# Test : RLC Série classique + une résistance de charge en parallèle sur le condensateur.
-# Attendu : V1, R1, L1, C1, R2 (Charge)
-run_test(
+    # 4. Filtre RLC avec Charge (Load)
+    # Test : RLC Série classique + une résistance de charge en parallèle sur le condensateur.
+    # Attendu : V1, R1, L1, C1, R2 (Charge)
     "Series RLC circuit with 12V source, 50 ohm resistor, 10mH inductor and 10uF capacitor, "
-    "with a 1k load resistor connected in parallel to the capacitor."
-)
+    "with a 1k load resistor connected in parallel to the capacitor.",
 
-# 5. Filtre en Pi (CL-C)
-# Test : Structure spécifique "Condensateur - Inductance - Condensateur"
-# Attendu : V1, C1, L1, C2
-run_test(
+    # 5. Filtre en Pi (CL-C)
+    # Test : Structure spécifique "Condensateur - Inductance - Condensateur"
+    # Attendu : V1, C1, L1, C2
     "Pi filter circuit connected to a 5V DC source, consisting of a 10uF input capacitor, "
-    "a 1mH series inductor, and a 10uF output capacitor."
-)
+    "a 1mH series inductor, and a 10uF output capacitor.",
+])
 # Mode interactif
 while True:
     user_input = input("\nEntrez une description de circuit (ou 'q' pour quitter) : ")
@@ -329,7 +390,7 @@ while True:
     is_valid, message = semantic_validate(netlist)
     if is_valid:
         print(f"\n✅ STATUT : NETLIST VALIDE")
-        draw_circuit(netlist)
+        _DRAW_POOL.submit(draw_circuit, netlist).add_done_callback(_report_draw_error)
     else:
         print(f"\n❌ STATUT : NETLIST INVALIDE ({message})")
     
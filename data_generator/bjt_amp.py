@@ -26,31 +26,15 @@
 #         samples.append((nl, spice))
 #     return samples
 # data_generator/bjt_amp.py
-import random
+import numpy as np
 
-def _choice(vals, rng):
-    return rng.choice(vals)
-
-def _ohm(rng):
-    return _choice(
-        ["220", "470", "1k", "2.2k", "4.7k", "10k", "22k", "47k", "100k"],
-        rng
-    )
-
-def _kohm(rng):
-    return _choice(
-        ["2.2k", "4.7k", "10k", "22k", "47k", "100k", "220k"],
-        rng
-    )
-
-def _cap(rng):
-    return _choice(
-        ["10n", "47n", "100n", "220n", "1u", "10u"],
-        rng
-    )
-
-def _volt(rng):
-    return _choice(["5", "9", "12"], rng)
+# Tables de valeurs au niveau module (dtype=object pour garder les chaînes)
+_OHM_VALS = np.array(["220", "470", "1k", "2.2k", "4.7k", "10k", "22k", "47k", "100k"], dtype=object)
+_KOHM_VALS = np.array(["2.2k", "4.7k", "10k", "22k", "47k", "100k", "220k"], dtype=object)
+_CAP_VALS = np.array(["10n", "47n", "100n", "220n", "1u", "10u"], dtype=object)
+_VOLT_VALS = np.array(["5", "9", "12"], dtype=object)
+_TOPOLOGIES = np.array(["CE", "CC"], dtype=object)
+_BIASES = np.array(["divider", "single"], dtype=object)
 
 def _nl_header(cfg):
     parts = ["A BJT amplifier circuit"]
@@ -94,35 +78,55 @@ def _nl_params(cfg):
 
     return " ".join(s)
 
-def generate(n_samples, seed=123):
-    rng = random.Random(seed)
+def generate(n_samples, seed=123, rng=None):
+    # rng injectable : un pilote peut partager un seul Generator déjà chauffé
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    # ====== 结构自由度 ======
+    # Tirages vectorisés : un appel C par dimension au lieu de n_samples
+    # appels rng.choice dans la boucle
+    topologies = rng.choice(_TOPOLOGIES, n_samples)        # 共射 / 射极跟随
+    biases = rng.choice(_BIASES, n_samples)                # 分压 / 单电阻
+    flags = rng.integers(0, 2, size=(n_samples, 5)).astype(bool)
+
+    # ====== 参数 ======
+    volts = rng.choice(_VOLT_VALS, n_samples)
+    rcs = rng.choice(_OHM_VALS, n_samples)
+    res = rng.choice(_OHM_VALS, n_samples)
+    rb1s = rng.choice(_KOHM_VALS, n_samples)
+    rb2s = rng.choice(_KOHM_VALS, n_samples)
+    rbs = rng.choice(_KOHM_VALS, n_samples)
+    rls = rng.choice(_KOHM_VALS, n_samples)
+    rfs = rng.choice(_KOHM_VALS, n_samples)
+    cin_caps = rng.choice(_CAP_VALS, n_samples)
+    ce_caps = rng.choice(_CAP_VALS, n_samples)
+    cout_caps = rng.choice(_CAP_VALS, n_samples)
+
     samples = []
 
-    for _ in range(n_samples):
-        # ====== 结构自由度 ======
+    for i in range(n_samples):
         cfg = {
-            "topology": rng.choice(["CE", "CC"]),          # 共射 / 射极跟随
-            "bias": rng.choice(["divider", "single"]),    # 分压 / 单电阻
-            "emitter_bypass": rng.choice([True, False]),
-            "input_coupling": rng.choice([True, False]),
-            "output_coupling": rng.choice([True, False]),
-            "feedback": rng.choice([True, False]),
-            "load": rng.choice([True, False]),
+            "topology": topologies[i],
+            "bias": biases[i],
+            "emitter_bypass": flags[i, 0],
+            "input_coupling": flags[i, 1],
+            "output_coupling": flags[i, 2],
+            "feedback": flags[i, 3],
+            "load": flags[i, 4],
+            "V": volts[i],
+            "Rc": rcs[i],
+            "Re": res[i],
         }
 
-        # ====== 参数 ======
-        cfg["V"] = _volt(rng)
-        cfg["Rc"] = _ohm(rng)
-        cfg["Re"] = _ohm(rng)
-
         if cfg["bias"] == "divider":
-            cfg["Rb1"] = _kohm(rng)
-            cfg["Rb2"] = _kohm(rng)
+            cfg["Rb1"] = rb1s[i]
+            cfg["Rb2"] = rb2s[i]
         else:
-            cfg["Rb"] = _kohm(rng)
+            cfg["Rb"] = rbs[i]
 
         if cfg["load"]:
-            cfg["Rl"] = _kohm(rng)
+            cfg["Rl"] = rls[i]
 
         # ====== NL ======
         nl = _nl_header(cfg) + " " + _nl_params(cfg)
@@ -140,7 +144,7 @@ def generate(n_samples, seed=123):
 
         # Input coupling
         if cfg["input_coupling"]:
-            lines.append(f"CIN in base {_cap(rng)}")
+            lines.append(f"CIN in base {cin_caps[i]}")
         else:
             lines.append("Vin in base AC 1")
 
@@ -155,13 +159,13 @@ def generate(n_samples, seed=123):
 
         # Emitter bypass
         if cfg["emitter_bypass"]:
-            lines.append(f"CE emitter 0 {_cap(rng)}")
+            lines.append(f"CE emitter 0 {ce_caps[i]}")
 
         # Output coupling & load
         out_node = "collector" if cfg["topology"] == "CE" else "emitter"
 
         if cfg["output_coupling"]:
-            lines.append(f"COUT {out_node} out {_cap(rng)}")
+            lines.append(f"COUT {out_node} out {cout_caps[i]}")
             if cfg["load"]:
                 lines.append(f"RL out 0 {cfg['Rl']}")
         else:
@@ -170,7 +174,7 @@ def generate(n_samples, seed=123):
 
         # Feedback
         if cfg["feedback"]:
-            lines.append(f"RF out base {_kohm(rng)}")
+            lines.append(f"RF out base {rfs[i]}")
 
         lines.append(".end")
 
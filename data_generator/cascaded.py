@@ -26,37 +26,48 @@
 #         samples.append((nl, spice))
 #     return samples
 # data_generator/cascaded.py
-import random
+import numpy as np
+
+# Tables de valeurs au niveau module (dtype=object pour garder les chaînes)
+_KOHM_VALS = np.array(["1k", "2.2k", "4.7k", "10k", "22k", "47k"], dtype=object)
+_CAP_VALS = np.array(["10n", "47n", "100n", "220n", "1u", "10u"], dtype=object)
+_VOLT_VALS = np.array(["3.3", "5", "9", "12"], dtype=object)
+_MODULES = np.array(["LP", "HP", "DIV"], dtype=object)
+_MAX_DEPTH = 4
+
+def generate(n_samples, seed=99, rng=None):
+    # rng injectable : un pilote peut partager un seul Generator déjà chauffé
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    # ===== 结构自由度 =====
+    # Tirages vectorisés : on pré-tire à la profondeur max et on tranche
+    depths = rng.integers(2, _MAX_DEPTH + 1, n_samples)
+    modules_all = rng.choice(_MODULES, size=(n_samples, _MAX_DEPTH))
+    has_loads = rng.integers(0, 2, n_samples).astype(bool)
+    volts = rng.choice(_VOLT_VALS, n_samples)
+    tap_u = rng.random(n_samples)  # position du tap, mise à l'échelle par profondeur
+
+    # Valeurs par étage (LP/HP : R et C ; DIV : deux résistances)
+    stage_rs = rng.choice(_KOHM_VALS, size=(n_samples, _MAX_DEPTH))
+    stage_cs = rng.choice(_CAP_VALS, size=(n_samples, _MAX_DEPTH))
+    stage_r2s = rng.choice(_KOHM_VALS, size=(n_samples, _MAX_DEPTH))
+    rls = rng.choice(_KOHM_VALS, n_samples)
 
-def _choice(vals, rng):
-    return rng.choice(vals)
-
-def _kohm(rng):
-    return _choice(["1k", "2.2k", "4.7k", "10k", "22k", "47k"], rng)
-
-def _cap(rng):
-    return _choice(["10n", "47n", "100n", "220n", "1u", "10u"], rng)
-
-def _volt(rng):
-    return _choice(["3.3", "5", "9", "12"], rng)
-
-def generate(n_samples, seed=99):
-    rng = random.Random(seed)
     samples = []
 
-    for _ in range(n_samples):
-        # ===== 结构自由度 =====
-        depth = rng.choice([2, 3, 4])
-        modules = rng.choices(["LP", "HP", "DIV"], k=depth)
-        has_load = rng.choice([True, False])
+    for i in range(n_samples):
+        depth = int(depths[i])
+        modules = list(modules_all[i, :depth])
+        has_load = has_loads[i]
 
-        V = _volt(rng)
+        V = volts[i]
 
         # Nodes: in -> n1 -> n2 -> ... -> out
-        nodes = ["in"] + [f"n{i}" for i in range(1, depth)] + ["out"]
+        nodes = ["in"] + [f"n{j}" for j in range(1, depth)] + ["out"]
 
         # Output tap
-        tap_node = rng.choice(nodes[1:])  # 不从 in 取
+        tap_node = nodes[1:][int(tap_u[i] * depth)]  # 不从 in 取
 
         # ===== NL =====
         module_desc = {
@@ -70,8 +81,8 @@ def generate(n_samples, seed=99):
             f"powered by a {V}V DC source."
         ]
 
-        for i, m in enumerate(modules):
-            nl_parts.append(f"Stage {i+1} is {module_desc[m]}.")
+        for j, m in enumerate(modules):
+            nl_parts.append(f"Stage {j+1} is {module_desc[m]}.")
 
         nl_parts.append(f"The output is taken from node {tap_node}.")
         if has_load:
@@ -83,31 +94,24 @@ def generate(n_samples, seed=99):
         lines = []
         lines.append(f"V1 in 0 DC {V}")
 
-        for i, m in enumerate(modules):
-            n_left = nodes[i]
-            n_right = nodes[i+1]
+        for j, m in enumerate(modules):
+            n_left = nodes[j]
+            n_right = nodes[j+1]
 
             if m == "LP":
-                R = _kohm(rng)
-                C = _cap(rng)
-                lines.append(f"R{i+1} {n_left} {n_right} {R}")
-                lines.append(f"C{i+1} {n_right} 0 {C}")
+                lines.append(f"R{j+1} {n_left} {n_right} {stage_rs[i, j]}")
+                lines.append(f"C{j+1} {n_right} 0 {stage_cs[i, j]}")
 
             elif m == "HP":
-                R = _kohm(rng)
-                C = _cap(rng)
-                lines.append(f"C{i+1} {n_left} {n_right} {C}")
-                lines.append(f"R{i+1} {n_right} 0 {R}")
+                lines.append(f"C{j+1} {n_left} {n_right} {stage_cs[i, j]}")
+                lines.append(f"R{j+1} {n_right} 0 {stage_rs[i, j]}")
 
             elif m == "DIV":
-                R1 = _kohm(rng)
-                R2 = _kohm(rng)
-                lines.append(f"R{i+1}a {n_left} {n_right} {R1}")
-                lines.append(f"R{i+1}b {n_right} 0 {R2}")
+                lines.append(f"R{j+1}a {n_left} {n_right} {stage_rs[i, j]}")
+                lines.append(f"R{j+1}b {n_right} 0 {stage_r2s[i, j]}")
 
         if has_load:
-            RL = _kohm(rng)
-            lines.append(f"RL {tap_node} 0 {RL}")
+            lines.append(f"RL {tap_node} 0 {rls[i]}")
 
         lines.append(".end")
 
@@ -1,27 +1,37 @@
 # circuit_generators/export_csv.py
 import csv
+import itertools
+import pandas as pd
 from rc import generate as rc_gen
 from cascaded import generate as cascaded_gen
 from feedback import generate as feedback_gen
 from bjt_amp import generate as bjt_gen
 from mos_amp import generate as mos_gen
-import random
+import numpy as np
 
-rng = random.Random(42)
+# Un seul Generator partagé par tout le pipeline : initialisation payée une
+# fois et reproductibilité globale sur la seule graine maîtresse
+rng = np.random.default_rng(42)
 
-dataset = []
-dataset += rc_gen(250)
-dataset += cascaded_gen(400)
-dataset += feedback_gen(350)
-dataset += bjt_gen(300)
-dataset += mos_gen(300)
+# Une seule liste matérialisée (le shuffle impose de tout garder),
+# remplie en chaînant les générateurs sans listes intermédiaires
+dataset = list(itertools.chain(
+    rc_gen(250, rng=rng),
+    cascaded_gen(400, rng=rng),
+    feedback_gen(350, rng=rng),
+    bjt_gen(300, rng=rng),
+    mos_gen(300, rng=rng),
+))
 
 rng.shuffle(dataset)
 
-with open("results_augmented.csv", "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f, quoting=csv.QUOTE_ALL)
-    writer.writerow(["input_text", "output_text"])
-    for nl, spice in dataset:
-        writer.writerow([nl, spice])
+# Sérialisation CSV via pandas (implémentation C) : le quoting par cellule
+# ne passe plus par le module csv Python
+pd.DataFrame(dataset, columns=["input_text", "output_text"]).to_csv(
+    "results_augmented.csv",
+    index=False,
+    quoting=csv.QUOTE_ALL,
+    encoding="utf-8",
+)
 
 print(f"Generated {len(dataset)} samples → results_augmented.csv")
@@ -23,47 +23,112 @@
 #         samples.append((nl, spice))
 #     return samples
 # data_generator/feedback.py
-import random
-
-def _choice(vals, rng):
-    return rng.choice(vals)
-
-def _kohm(rng):
-    return _choice(["1k", "2.2k", "4.7k", "10k", "22k", "47k", "100k"], rng)
-
-def _cap(rng):
-    return _choice(["10n", "47n", "100n", "220n", "1u", "10u"], rng)
-
-def _volt(rng):
-    return _choice(["3.3", "5", "9", "12"], rng)
-
-def generate(n_samples, seed=7):
-    rng = random.Random(seed)
-    samples = []
-
-    for _ in range(n_samples):
-        # ======================
-        # 主体电路（被反馈）
-        # ======================
-        depth = rng.choice([1, 2])  # 单级 / 两级 RC
-        ordering = rng.choice(["LP", "HP"])
-
-        V = _volt(rng)
+import itertools
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Tables de valeurs au niveau module (dtype=object pour garder les chaînes)
+_KOHM_VALS = np.array(["1k", "2.2k", "4.7k", "10k", "22k", "47k", "100k"], dtype=object)
+_CAP_VALS = np.array(["10n", "47n", "100n", "220n", "1u", "10u"], dtype=object)
+_VOLT_VALS = np.array(["3.3", "5", "9", "12"], dtype=object)
+_ORDERINGS = np.array(["LP", "HP"], dtype=object)
+_FB_TYPES = np.array(["R", "C", "RC"], dtype=object)
+_MAX_DEPTH = 2
+
+# Paires (fb_from, fb_to) valides par profondeur : un seul tirage joint,
+# plus de branche corrective "from == to" (qui sur-pondérait fb_to='in')
+_FB_PAIRS = {
+    1: (("n1", "in"), ("out", "in"), ("out", "n1")),
+    2: (("n1", "in"), ("n2", "in"), ("out", "in"), ("n2", "n1"), ("out", "n1")),
+}
+
+# Constantes de texte au niveau module : plus de dict reconstruit par échantillon
+_FB_DESC = {
+    "R": "a resistive feedback path",
+    "C": "a capacitive feedback path",
+    "RC": "a resistive-capacitive feedback network"
+}
+
+# Gabarits SPICE construits une fois par forme (depth, ordering, fb_type,
+# fb_from, fb_to) puis réutilisés : stockés en forme %s + ordre des champs,
+# le formatage par échantillon est un seul appel C sans re-parsing
+_SPICE_TEMPLATES = {}
+
+def _to_percent(tmpl):
+    # "{R1}" -> "%s", en mémorisant l'ordre des champs
+    order = tuple(re.findall(r"\{(\w+)\}", tmpl))
+    return re.sub(r"\{\w+\}", "%s", tmpl), order
+
+def _spice_template(depth, ordering, fb_type, fb_from, fb_to):
+    key = (depth, ordering, fb_type, fb_from, fb_to)
+    tmpl = _SPICE_TEMPLATES.get(key)
+    if tmpl is not None:
+        return tmpl
+
+    nodes = ["in"] + [f"n{j}" for j in range(1, depth+1)] + ["out"]
+    lines = ["V1 in 0 DC {V}"]
+
+    # 主路径
+    for j in range(depth):
+        n_left = nodes[j]
+        n_right = nodes[j+1]
+        if ordering == "LP":
+            lines.append(f"R{j+1} {n_left} {n_right} {{R{j+1}}}")
+            lines.append(f"C{j+1} {n_right} 0 {{C{j+1}}}")
+        else:
+            lines.append(f"C{j+1} {n_left} {n_right} {{C{j+1}}}")
+            lines.append(f"R{j+1} {n_right} 0 {{R{j+1}}}")
+
+    # 反馈路径
+    if fb_type == "R":
+        lines.append(f"Rf {fb_from} {fb_to} {{Rf}}")
+    elif fb_type == "C":
+        lines.append(f"Cf {fb_from} {fb_to} {{Cf}}")
+    else:  # RC
+        lines.append(f"Rf {fb_from} nf {{Rf}}")
+        lines.append(f"Cf nf {fb_to} {{Cf}}")
+
+    lines.append(".end")
+
+    tmpl = _to_percent("\n".join(lines))
+    _SPICE_TEMPLATES[key] = tmpl
+    return tmpl
+
+def generate(n_samples, seed=7, rng=None):
+    # rng injectable : un pilote peut partager un seul Generator déjà chauffé
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    # ======================
+    # 结构自由度（全部向量化预抽样）
+    # ======================
+    depths = rng.integers(1, _MAX_DEPTH + 1, n_samples)     # 单级 / 两级 RC
+    orderings = rng.choice(_ORDERINGS, n_samples)
+    volts = rng.choice(_VOLT_VALS, n_samples)
+    fb_types = rng.choice(_FB_TYPES, n_samples)             # 反馈类型
+    fb_pair_u = rng.random(n_samples)                       # 反馈路径（按表长缩放）
+
+    # 主路径与反馈路径的元件值
+    stage_rs = rng.choice(_KOHM_VALS, size=(n_samples, _MAX_DEPTH))
+    stage_cs = rng.choice(_CAP_VALS, size=(n_samples, _MAX_DEPTH))
+    fb_rs = rng.choice(_KOHM_VALS, n_samples)
+    fb_cs = rng.choice(_CAP_VALS, n_samples)
+
+    for i in range(n_samples):
+        depth = int(depths[i])
+        ordering = orderings[i]
+        V = volts[i]
 
         # nodes: in -> n1 -> out (depth=1)
         # nodes: in -> n1 -> n2 -> out (depth=2)
-        nodes = ["in"] + [f"n{i}" for i in range(1, depth+1)] + ["out"]
-
-        # ======================
-        # 反馈结构自由度
-        # ======================
-        fb_type = rng.choice(["R", "C", "RC"])     # 反馈类型
-        fb_from = rng.choice(nodes[1:])            # 从哪里反馈
-        fb_to = rng.choice(["in", "n1"])            # 反馈到哪里（不一定是输入）
+        nodes = ["in"] + [f"n{j}" for j in range(1, depth+1)] + ["out"]
 
-        # 防止无意义的“自己接自己”
-        if fb_from == fb_to:
-            fb_to = "in"
+        fb_type = fb_types[i]
+        pairs = _FB_PAIRS[depth]
+        fb_from, fb_to = pairs[int(fb_pair_u[i] * len(pairs))]
 
         # ======================
         # NL 描述
@@ -82,13 +147,8 @@ def generate(n_samples, seed=7):
         if depth == 2:
             nl_parts.append("The circuit uses two cascaded RC stages.")
 
-        fb_desc = {
-            "R": "a resistive feedback path",
-            "C": "a capacitive feedback path",
-            "RC": "a resistive-capacitive feedback network"
-        }
         nl_parts.append(
-            f"The feedback is implemented using {fb_desc[fb_type]}, "
+            f"The feedback is implemented using {_FB_DESC[fb_type]}, "
             f"from node {fb_from} to node {fb_to}."
         )
 
@@ -97,36 +157,30 @@ def generate(n_samples, seed=7):
         # ======================
         # SPICE
         # ======================
-        lines = []
-        lines.append(f"V1 in 0 DC {V}")
-
-        # 主路径
-        for i in range(depth):
-            n_left = nodes[i]
-            n_right = nodes[i+1]
-
-            R = _kohm(rng)
-            C = _cap(rng)
-
-            if ordering == "LP":
-                lines.append(f"R{i+1} {n_left} {n_right} {R}")
-                lines.append(f"C{i+1} {n_right} 0 {C}")
-            else:
-                lines.append(f"C{i+1} {n_left} {n_right} {C}")
-                lines.append(f"R{i+1} {n_right} 0 {R}")
-
-        # 反馈路径
-        if fb_type == "R":
-            lines.append(f"Rf {fb_from} {fb_to} {_kohm(rng)}")
-        elif fb_type == "C":
-            lines.append(f"Cf {fb_from} {fb_to} {_cap(rng)}")
-        else:  # RC
-            lines.append(f"Rf {fb_from} nf {_kohm(rng)}")
-            lines.append(f"Cf nf {fb_to} {_cap(rng)}")
-
-        lines.append(".end")
-
-        spice = "\n".join(lines)
-        samples.append((nl, spice))
-
-    return samples
+        values = {"V": V, "Rf": fb_rs[i], "Cf": fb_cs[i]}
+        for j in range(depth):
+            values[f"R{j+1}"] = stage_rs[i, j]
+            values[f"C{j+1}"] = stage_cs[i, j]
+        tmpl, order = _spice_template(depth, ordering, fb_type, fb_from, fb_to)
+        spice = tmpl % tuple(values[k] for k in order)
+        yield (nl, spice)
+
+def generate_list(n_samples, seed=7):
+    # Enveloppe de compatibilité pour les appelants qui veulent une liste
+    # (et pour le pool de processus : un générateur ne se picklise pas)
+    return list(generate(n_samples, seed))
+
+def generate_parallel(n_samples, seed=7, workers=None):
+    # Les échantillons sont indépendants : on découpe en k tranches avec des
+    # sous-graines déterministes et on les génère sur plusieurs processus.
+    # Reproductible à (seed, k) fixés.
+    k = workers or os.cpu_count() or 1
+    if k <= 1 or n_samples < k:
+        return generate_list(n_samples, seed)
+    sizes = [n_samples // k] * k
+    for i in range(n_samples % k):
+        sizes[i] += 1
+    subseeds = [(seed * 1000003 + i) & 0xFFFFFFFF for i in range(k)]
+    with ProcessPoolExecutor(max_workers=k) as ex:
+        chunks = ex.map(generate_list, sizes, subseeds)
+    return list(itertools.chain.from_iterable(chunks))
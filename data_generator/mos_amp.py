@@ -24,160 +24,219 @@
 #         samples.append((nl, spice))
 #     return samples
 # data_generator/mos_amp.py
-import random
-
-def _choice(vals, rng):
-    return rng.choice(vals)
-
-def _ohm(rng):
-    return _choice(
-        ["220", "470", "1k", "2.2k", "4.7k", "10k", "22k", "47k"],
-        rng
-    )
-
-def _kohm(rng):
-    return _choice(
-        ["10k", "22k", "47k", "100k", "220k", "470k"],
-        rng
-    )
-
-def _cap(rng):
-    return _choice(
-        ["10n", "47n", "100n", "220n", "1u", "10u"],
-        rng
-    )
-
-def _volt(rng):
-    return _choice(["5", "9", "12"], rng)
-
-def _nl_header(cfg):
+import itertools
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+# Tables de valeurs au niveau module (dtype=object pour garder les chaînes)
+_OHM_VALS = np.array(["220", "470", "1k", "2.2k", "4.7k", "10k", "22k", "47k"], dtype=object)
+_KOHM_VALS = np.array(["10k", "22k", "47k", "100k", "220k", "470k"], dtype=object)
+_CAP_VALS = np.array(["10n", "47n", "100n", "220n", "1u", "10u"], dtype=object)
+_VOLT_VALS = np.array(["5", "9", "12"], dtype=object)
+_TOPOLOGIES = np.array(["CS", "CD", "CG"], dtype=object)
+_BIASES = np.array(["divider", "single"], dtype=object)
+
+# Constantes de texte au niveau module
+_TOPO_DESC = {
+    "CS": "in a common-source configuration",
+    "CD": "in a common-drain (source follower) configuration",
+    "CG": "in a common-gate configuration"
+}
+
+# 96 formes structurelles distinctes au maximum -> chaque phrase d'en-tête
+# n'est construite qu'une fois puis resservie
+@lru_cache(maxsize=128)
+def _nl_header(topology, gate_bias, source_deg, input_coupling, output_coupling, load):
     parts = ["A MOSFET amplifier circuit"]
 
-    topo_desc = {
-        "CS": "in a common-source configuration",
-        "CD": "in a common-drain (source follower) configuration",
-        "CG": "in a common-gate configuration"
-    }
-    parts.append(topo_desc[cfg["topology"]])
+    parts.append(_TOPO_DESC[topology])
 
-    if cfg["gate_bias"] == "divider":
+    if gate_bias == "divider":
         parts.append("using a resistive voltage divider gate bias")
     else:
         parts.append("using a single gate bias resistor")
 
-    if cfg["source_deg"]:
+    if source_deg:
         parts.append("with source degeneration")
 
-    if cfg["input_coupling"]:
+    if input_coupling:
         parts.append("and an input coupling capacitor")
 
-    if cfg["output_coupling"]:
+    if output_coupling:
         parts.append("and an output coupling capacitor")
 
-    if cfg["load"]:
+    if load:
         parts.append("driving a resistive load")
 
     return " ".join(parts) + "."
 
+class _Cfg:
+    # Configuration par échantillon : classe à __slots__ plutôt que dict,
+    # l'accès attribut est un chargement de slot C au lieu d'un hachage
+    __slots__ = ("topology", "gate_bias", "source_deg", "input_coupling",
+                 "output_coupling", "load", "V", "Rd", "Rs", "Rg", "Rg1", "Rg2", "Rl")
+
 def _nl_params(cfg):
-    s = [f"The circuit is powered by a {cfg['V']}V DC supply."]
-    s.append(f"The drain resistor is {cfg['Rd']}.")
+    s = [f"The circuit is powered by a {cfg.V}V DC supply."]
+    s.append(f"The drain resistor is {cfg.Rd}.")
 
-    if cfg["source_deg"]:
-        s.append(f"The source resistor is {cfg['Rs']}.")
+    if cfg.source_deg:
+        s.append(f"The source resistor is {cfg.Rs}.")
 
-    if cfg["gate_bias"] == "divider":
-        s.append(f"The gate bias resistors are {cfg['Rg1']} and {cfg['Rg2']}.")
+    if cfg.gate_bias == "divider":
+        s.append(f"The gate bias resistors are {cfg.Rg1} and {cfg.Rg2}.")
     else:
-        s.append(f"The gate bias resistor is {cfg['Rg']}.")
+        s.append(f"The gate bias resistor is {cfg.Rg}.")
 
-    if cfg["load"]:
-        s.append(f"The load resistor is {cfg['Rl']}.")
+    if cfg.load:
+        s.append(f"The load resistor is {cfg.Rl}.")
 
     return " ".join(s)
 
-def generate(n_samples, seed=202):
-    rng = random.Random(seed)
-    samples = []
-
-    for _ in range(n_samples):
-        # ========= 结构自由度 =========
-        cfg = {
-            "topology": rng.choice(["CS", "CD", "CG"]),      # 共源 / 源跟随 / 共栅
-            "gate_bias": rng.choice(["divider", "single"]),
-            "source_deg": rng.choice([True, False]),
-            "input_coupling": rng.choice([True, False]),
-            "output_coupling": rng.choice([True, False]),
-            "load": rng.choice([True, False]),
-        }
-
-        # ========= 参数 =========
-        cfg["V"] = _volt(rng)
-        cfg["Rd"] = _ohm(rng)
-        cfg["Rs"] = _ohm(rng)
-
-        if cfg["gate_bias"] == "divider":
-            cfg["Rg1"] = _kohm(rng)
-            cfg["Rg2"] = _kohm(rng)
-        else:
-            cfg["Rg"] = _kohm(rng)
-
-        if cfg["load"]:
-            cfg["Rl"] = _kohm(rng)
-
-        # ========= NL =========
-        nl = _nl_header(cfg) + " " + _nl_params(cfg)
+def _spice_lines(topology, gate_bias, source_deg, input_coupling, output_coupling, load):
+    lines = ["VDD vdd 0 DC {V}"]
 
-        # ========= SPICE =========
-        lines = []
-        lines.append(f"VDD vdd 0 DC {cfg['V']}")
+    # Gate bias
+    if gate_bias == "divider":
+        lines.append("R1 vdd gate {Rg1}")
+        lines.append("R2 gate 0 {Rg2}")
+    else:
+        lines.append("Rg vdd gate {Rg}")
 
-        # Gate bias
-        if cfg["gate_bias"] == "divider":
-            lines.append(f"R1 vdd gate {cfg['Rg1']}")
-            lines.append(f"R2 gate 0 {cfg['Rg2']}")
-        else:
-            lines.append(f"Rg vdd gate {cfg['Rg']}")
+    # Input coupling
+    if input_coupling:
+        lines.append("CIN in gate {CIN}")
+    else:
+        lines.append("Vin in gate AC 1")
 
-        # Input coupling
-        if cfg["input_coupling"]:
-            lines.append(f"CIN in gate {_cap(rng)}")
+    # MOS topology
+    if topology == "CS":
+        lines.append("Rd vdd drain {Rd}")
+        if source_deg:
+            lines.append("Rs source 0 {Rs}")
         else:
-            lines.append("Vin in gate AC 1")
-
-        # MOS topology
-        if cfg["topology"] == "CS":
-            lines.append(f"Rd vdd drain {cfg['Rd']}")
-            if cfg["source_deg"]:
-                lines.append(f"Rs source 0 {cfg['Rs']}")
-            else:
-                lines.append("Rs source 0 0")
-            lines.append("M1 drain gate source source NMOS")
-
-        elif cfg["topology"] == "CD":  # source follower
-            lines.append("M1 vdd gate source source NMOS")
-            lines.append(f"Rs source 0 {cfg['Rs']}")
-
-        else:  # CG
-            lines.append(f"Rd vdd drain {cfg['Rd']}")
-            lines.append("M1 drain gate source source NMOS")
-            if cfg["source_deg"]:
-                lines.append(f"Rs source 0 {cfg['Rs']}")
-
-        # Output coupling & load
-        out_node = "drain" if cfg["topology"] != "CD" else "source"
-
-        if cfg["output_coupling"]:
-            lines.append(f"COUT {out_node} out {_cap(rng)}")
-            if cfg["load"]:
-                lines.append(f"RL out 0 {cfg['Rl']}")
+            lines.append("Rs source 0 0")
+        lines.append("M1 drain gate source source NMOS")
+
+    elif topology == "CD":  # source follower
+        lines.append("M1 vdd gate source source NMOS")
+        lines.append("Rs source 0 {Rs}")
+
+    else:  # CG
+        lines.append("Rd vdd drain {Rd}")
+        lines.append("M1 drain gate source source NMOS")
+        if source_deg:
+            lines.append("Rs source 0 {Rs}")
+
+    # Output coupling & load
+    out_node = "drain" if topology != "CD" else "source"
+
+    if output_coupling:
+        lines.append("COUT " + out_node + " out {COUT}")
+        if load:
+            lines.append("RL out 0 {RL}")
+    else:
+        if load:
+            lines.append("RL " + out_node + " 0 {RL}")
+
+    lines.append(".end")
+    return lines
+
+def _to_percent(tmpl):
+    # "{Rd}" -> "%s", en mémorisant l'ordre des champs : le formatage par
+    # échantillon devient un seul appel C sans re-parsing des {placeholders}
+    order = tuple(re.findall(r"\{(\w+)\}", tmpl))
+    return re.sub(r"\{\w+\}", "%s", tmpl), order
+
+# Toutes les formes structurelles sont énumérées à l'import (3*2*2*2*2*2 = 96) :
+# la boucle d'échantillonnage se réduit à un lookup + un formatage %
+_SPICE_TEMPLATES = {
+    key: _to_percent("\n".join(_spice_lines(*key)))
+    for key in itertools.product(
+        ("CS", "CD", "CG"), ("divider", "single"),
+        (True, False), (True, False), (True, False), (True, False)
+    )
+}
+
+def generate(n_samples, seed=202, rng=None):
+    # rng injectable : un pilote peut partager un seul Generator déjà chauffé
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    # ========= 结构自由度 =========
+    # Tirages vectorisés : un appel C par dimension au lieu de n_samples
+    # appels rng.choice dans la boucle
+    topologies = rng.choice(_TOPOLOGIES, n_samples)     # 共源 / 源跟随 / 共栅
+    biases = rng.choice(_BIASES, n_samples)
+    flags = rng.integers(0, 2, size=(n_samples, 4)).astype(bool)
+
+    # ========= 参数 =========
+    volts = rng.choice(_VOLT_VALS, n_samples)
+    rds = rng.choice(_OHM_VALS, n_samples)
+    rss = rng.choice(_OHM_VALS, n_samples)
+    rg1s = rng.choice(_KOHM_VALS, n_samples)
+    rg2s = rng.choice(_KOHM_VALS, n_samples)
+    rgs = rng.choice(_KOHM_VALS, n_samples)
+    rls = rng.choice(_KOHM_VALS, n_samples)
+    cin_caps = rng.choice(_CAP_VALS, n_samples)
+    cout_caps = rng.choice(_CAP_VALS, n_samples)
+
+    for i in range(n_samples):
+        cfg = _Cfg()
+        cfg.topology = topologies[i]
+        cfg.gate_bias = biases[i]
+        cfg.source_deg = bool(flags[i, 0])
+        cfg.input_coupling = bool(flags[i, 1])
+        cfg.output_coupling = bool(flags[i, 2])
+        cfg.load = bool(flags[i, 3])
+        cfg.V = volts[i]
+        cfg.Rd = rds[i]
+        cfg.Rs = rss[i]
+
+        if cfg.gate_bias == "divider":
+            cfg.Rg1 = rg1s[i]
+            cfg.Rg2 = rg2s[i]
         else:
-            if cfg["load"]:
-                lines.append(f"RL {out_node} 0 {cfg['Rl']}")
+            cfg.Rg = rgs[i]
 
-        lines.append(".end")
+        if cfg.load:
+            cfg.Rl = rls[i]
 
-        spice = "\n".join(lines)
-        samples.append((nl, spice))
+        # ========= NL =========
+        key = (cfg.topology, cfg.gate_bias, cfg.source_deg,
+               cfg.input_coupling, cfg.output_coupling, cfg.load)
+        nl = _nl_header(*key) + " " + _nl_params(cfg)
 
-    return samples
+        # ========= SPICE =========
+        values = {
+            "V": cfg.V, "Rd": cfg.Rd, "Rs": cfg.Rs,
+            "Rg1": rg1s[i], "Rg2": rg2s[i], "Rg": rgs[i], "RL": rls[i],
+            "CIN": cin_caps[i], "COUT": cout_caps[i],
+        }
+        tmpl, order = _SPICE_TEMPLATES[key]
+        spice = tmpl % tuple(values[k] for k in order)
+        yield (nl, spice)
+
+def generate_list(n_samples, seed=202):
+    # Enveloppe de compatibilité pour les appelants qui veulent une liste
+    # (et pour le pool de processus : un générateur ne se picklise pas)
+    return list(generate(n_samples, seed))
+
+def generate_parallel(n_samples, seed=202, workers=None):
+    # Les échantillons sont indépendants : on découpe en k tranches avec des
+    # sous-graines déterministes et on les génère sur plusieurs processus.
+    # Reproductible à (seed, k) fixés.
+    k = workers or os.cpu_count() or 1
+    if k <= 1 or n_samples < k:
+        return generate_list(n_samples, seed)
+    sizes = [n_samples // k] * k
+    for i in range(n_samples % k):
+        sizes[i] += 1
+    subseeds = [(seed * 1000003 + i) & 0xFFFFFFFF for i in range(k)]
+    with ProcessPoolExecutor(max_workers=k) as ex:
+        chunks = ex.map(generate_list, sizes, subseeds)
+    return list(itertools.chain.from_iterable(chunks))
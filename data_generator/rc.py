@@ -92,19 +92,20 @@
 
 #     return samples
 # data_generator/rc.py
-import random
+import itertools
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
-def _choice(vals, rng):
-    return rng.choice(vals)
+import numpy as np
 
-def _kOhm(rng):
-    return _choice(["1k", "2.2k", "4.7k", "10k", "22k", "47k", "100k"], rng)
-
-def _cap(rng):
-    return _choice(["10n", "47n", "100n", "220n", "470n", "1u", "2.2u", "10u"], rng)
-
-def _volt(rng):
-    return _choice(["3.3", "5", "9", "12"], rng)
+# Tables de valeurs au niveau module (dtype=object pour garder les chaînes)
+_KOHM_VALS = np.array(["1k", "2.2k", "4.7k", "10k", "22k", "47k", "100k"], dtype=object)
+_CAP_VALS = np.array(["10n", "47n", "100n", "220n", "470n", "1u", "2.2u", "10u"], dtype=object)
+_VOLT_VALS = np.array(["3.3", "5", "9", "12"], dtype=object)
+_ORDERINGS = np.array(["LP", "HP"], dtype=object)
+_MAX_DEPTH = 3
 
 def _mk_nodes(depth):
     # in -> n1 -> n2 -> ... -> out
@@ -113,8 +114,10 @@ def _mk_nodes(depth):
     mids = [f"n{i}" for i in range(1, depth)]
     return ["in"] + mids + ["out"]
 
+@lru_cache(maxsize=128)
 def _nl_header(ordering, depth, has_load, tap, ladder):
     # ordering: "LP" (R then C) or "HP" (C then R)
+    # Pure sur ses arguments et peu de combinaisons -> mémoïsé
     ftype = "low-pass" if ordering == "LP" else "high-pass"
     stage_txt = "single-stage" if depth == 1 else f"{depth}-stage"
     parts = [f"A {stage_txt} RC {ftype} filter"]
@@ -136,48 +139,62 @@ def _nl_params(V, ordering, depth, Rs, Cs, loadR, ladder):
     else:
         s.append(f"The filter has {depth} stage(s).")
 
-    # Mention elements by stage
-    for i in range(depth):
-        s.append(f"Stage {i+1} uses R{i+1}={Rs[i]} and C{i+1}={Cs[i]}.")
+    # Mention elements by stage (depth <= 3 : déroulé en une seule f-string)
+    if depth == 1:
+        s.append(f"Stage 1 uses R1={Rs[0]} and C1={Cs[0]}.")
+    elif depth == 2:
+        s.append(f"Stage 1 uses R1={Rs[0]} and C1={Cs[0]}. "
+                 f"Stage 2 uses R2={Rs[1]} and C2={Cs[1]}.")
+    else:
+        s.append(f"Stage 1 uses R1={Rs[0]} and C1={Cs[0]}. "
+                 f"Stage 2 uses R2={Rs[1]} and C2={Cs[1]}. "
+                 f"Stage 3 uses R3={Rs[2]} and C3={Cs[2]}.")
     if loadR is not None:
         s.append(f"The load resistor is RL={loadR}.")
     return " ".join(s)
 
-def _spice_lp(nodes, Rs, Cs, loadR=None, tap_node="out"):
-    # Low-pass: series R then shunt C to ground at each stage node
-    lines = []
-    lines.append(f"V1 in 0 DC {{V}}")  # placeholder V replaced later
-    # stages
-    for i in range(len(Rs)):
+# Gabarits SPICE construits une fois par forme (ordering, depth, has_load, tap)
+# puis réutilisés : stockés en forme %s + ordre des champs, le formatage
+# par échantillon est un seul appel C (PyUnicode_Format) sans re-parsing
+# des {placeholders}
+_SPICE_TEMPLATES = {}
+
+def _to_percent(tmpl):
+    # "{R1}" -> "%s", en mémorisant l'ordre des champs
+    order = tuple(re.findall(r"\{(\w+)\}", tmpl))
+    return re.sub(r"\{\w+\}", "%s", tmpl), order
+
+def _spice_template(ordering, depth, has_load, tap_node):
+    key = (ordering, depth, has_load, tap_node)
+    tmpl = _SPICE_TEMPLATES.get(key)
+    if tmpl is not None:
+        return tmpl
+
+    nodes = _mk_nodes(depth)
+    lines = ["V1 in 0 DC {V}"]
+    for i in range(depth):
         n_left = nodes[i]
         n_right = nodes[i+1]
-        lines.append(f"R{i+1} {n_left} {n_right} {Rs[i]}")
-        # shunt capacitor at the stage node (right node)
-        lines.append(f"C{i+1} {n_right} 0 {Cs[i]}")
+        if ordering == "LP":
+            # Low-pass: series R then shunt C to ground at each stage node
+            lines.append(f"R{i+1} {n_left} {n_right} {{R{i+1}}}")
+            lines.append(f"C{i+1} {n_right} 0 {{C{i+1}}}")
+        else:
+            # High-pass: series C then shunt R to ground at each stage node
+            lines.append(f"C{i+1} {n_left} {n_right} {{C{i+1}}}")
+            lines.append(f"R{i+1} {n_right} 0 {{R{i+1}}}")
     # load at tap node
-    if loadR is not None:
-        lines.append(f"RL {tap_node} 0 {loadR}")
+    if has_load:
+        lines.append(f"RL {tap_node} 0 {{RL}}")
     lines.append(".end")
-    return lines
 
-def _spice_hp(nodes, Rs, Cs, loadR=None, tap_node="out"):
-    # High-pass: series C then shunt R to ground at each stage node
-    lines = []
-    lines.append(f"V1 in 0 DC {{V}}")
-    for i in range(len(Rs)):
-        n_left = nodes[i]
-        n_right = nodes[i+1]
-        lines.append(f"C{i+1} {n_left} {n_right} {Cs[i]}")
-        # shunt resistor at the stage node (right node)
-        lines.append(f"R{i+1} {n_right} 0 {Rs[i]}")
-    if loadR is not None:
-        lines.append(f"RL {tap_node} 0 {loadR}")
-    lines.append(".end")
-    return lines
+    tmpl = _to_percent("\n".join(lines))
+    _SPICE_TEMPLATES[key] = tmpl
+    return tmpl
 
-def generate(n_samples, seed=42):
+def generate(n_samples, seed=42, rng=None):
     """
-    Returns list of (input_text, output_text).
+    Yields (input_text, output_text) tuples (see generate_list for a list).
     Produces 20+ topology families by combining:
       - ordering: LP/HP
       - depth: 1..3
@@ -185,21 +202,32 @@ def generate(n_samples, seed=42):
       - load: None / RL at tap node
       - tap: output taken at out / n1 / n2 (when available)
     """
-    rng = random.Random(seed)
-    samples = []
-
-    for _ in range(n_samples):
-        ordering = rng.choice(["LP", "HP"])         # low-pass vs high-pass
-        depth = rng.choice([1, 2, 3])               # stages
-        ladder = rng.choice([True, False])          # textual+struct flavor
-        has_load = rng.choice([True, False])        # include RL sometimes
-
-        V = _volt(rng)
-        Rs = [_kOhm(rng) for _ in range(depth)]
-        Cs = [_cap(rng) for _ in range(depth)]
-        loadR = _kOhm(rng) if has_load else None
-
-        nodes = _mk_nodes(depth)  # ["in", "out"] or ["in","n1","out"] or ["in","n1","n2","out"]
+    # rng injectable : un pilote peut partager un seul Generator déjà chauffé
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    # Tirages vectorisés : on pré-tire à la profondeur max et on tranche
+    orderings = rng.choice(_ORDERINGS, n_samples)   # low-pass vs high-pass
+    depths = rng.integers(1, _MAX_DEPTH + 1, n_samples)
+    ladders = rng.integers(0, 2, n_samples).astype(bool)
+    has_loads = rng.integers(0, 2, n_samples).astype(bool)
+
+    volts = rng.choice(_VOLT_VALS, n_samples)
+    rs_all = rng.choice(_KOHM_VALS, size=(n_samples, _MAX_DEPTH))
+    cs_all = rng.choice(_CAP_VALS, size=(n_samples, _MAX_DEPTH))
+    load_rs = rng.choice(_KOHM_VALS, n_samples)
+    tap_u = rng.random(n_samples)  # position du tap, mise à l'échelle par profondeur
+
+    for i in range(n_samples):
+        ordering = orderings[i]
+        depth = int(depths[i])
+        ladder = ladders[i]
+        has_load = has_loads[i]
+
+        V = volts[i]
+        Rs = list(rs_all[i, :depth])
+        Cs = list(cs_all[i, :depth])
+        loadR = load_rs[i] if has_load else None
 
         # tap choices: take output at out or an intermediate node
         possible_taps = ["out"]
@@ -207,21 +235,37 @@ def generate(n_samples, seed=42):
             possible_taps.append("n1")
         if depth >= 3:
             possible_taps.append("n2")
-        tap_node = rng.choice(possible_taps)
+        tap_node = possible_taps[int(tap_u[i] * len(possible_taps))]
 
         # NL
         nl = _nl_header(ordering, depth, has_load, tap_node, ladder) + " " + _nl_params(V, ordering, depth, Rs, Cs, loadR, ladder)
 
         # SPICE (structure depends on ordering & depth)
-        if ordering == "LP":
-            lines = _spice_lp(nodes, Rs, Cs, loadR=loadR, tap_node=tap_node)
-        else:
-            lines = _spice_hp(nodes, Rs, Cs, loadR=loadR, tap_node=tap_node)
-
-        # Replace placeholder V
-        lines[0] = lines[0].format(V=V)
-        spice = "\n".join(lines)
-
-        samples.append((nl, spice))
-
-    return samples
+        values = {"V": V, "RL": loadR}
+        for j in range(depth):
+            values[f"R{j+1}"] = Rs[j]
+            values[f"C{j+1}"] = Cs[j]
+        tmpl, order = _spice_template(ordering, depth, has_load, tap_node)
+        spice = tmpl % tuple(values[k] for k in order)
+
+        yield (nl, spice)
+
+def generate_list(n_samples, seed=42):
+    # Enveloppe de compatibilité pour les appelants qui veulent une liste
+    # (et pour le pool de processus : un générateur ne se picklise pas)
+    return list(generate(n_samples, seed))
+
+def generate_parallel(n_samples, seed=42, workers=None):
+    # Les échantillons sont indépendants : on découpe en k tranches avec des
+    # sous-graines déterministes et on les génère sur plusieurs processus.
+    # Reproductible à (seed, k) fixés.
+    k = workers or os.cpu_count() or 1
+    if k <= 1 or n_samples < k:
+        return generate_list(n_samples, seed)
+    sizes = [n_samples // k] * k
+    for i in range(n_samples % k):
+        sizes[i] += 1
+    subseeds = [(seed * 1000003 + i) & 0xFFFFFFFF for i in range(k)]
+    with ProcessPoolExecutor(max_workers=k) as ex:
+        chunks = ex.map(generate_list, sizes, subseeds)
+    return list(itertools.chain.from_iterable(chunks))
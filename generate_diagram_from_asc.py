@@ -2,6 +2,7 @@ import argparse
 import wx
 import math
 import glob, os
+import re
 import rtreelib as rt
 import asc_viewer.symbol as symbol_module
 from asc_viewer.symbol import Symbol, window_types
@@ -12,6 +13,40 @@ import numpy as np
 # font sizes available in LTspice
 font_size_factors = [0.625, 1, 1.5, 2, 2.5, 3.5, 5, 7]
 
+# wx.Font objects by point size, reused across AscCanvas instances
+_FONT_CACHE = {}
+
+# matches all WIRE lines in one pass over the file contents
+_WIRE_RE = re.compile(r"^WIRE (-?\d+) (-?\d+) (-?\d+) (-?\d+)", re.MULTILINE)
+
+
+class _HeadlessClientDC(wx.MemoryDC):
+    """Stand-in for wx.ClientDC so symbol code can run without a window."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._bmp = wx.Bitmap(1, 1)
+        self.SelectObject(self._bmp)
+
+
+# patch once at import time rather than per AscCanvas instance
+if not getattr(wx, "_headless_patched", False):
+    wx.ClientDC = _HeadlessClientDC
+    symbol_module.wx.ClientDC = _HeadlessClientDC
+    wx._headless_patched = True
+
+# "In" flag outline precomputed for the four possible rotations; drawing a
+# flag is then a per-point translation instead of a matrix transform
+_IN_FLAG_BASE = ((0, 0), (10, 10), (10, 20), (-10, 20), (-10, 10), (0, 0))
+_IN_FLAG_POINTS = {
+    d: tuple(
+        (round(x * math.cos(math.pi / 2 * d) - y * math.sin(math.pi / 2 * d)),
+         round(x * math.sin(math.pi / 2 * d) + y * math.cos(math.pi / 2 * d)))
+        for x, y in _IN_FLAG_BASE
+    )
+    for d in range(4)
+}
+
 
 class Net:
     """A net as used in LtSpice."""
@@ -42,7 +77,8 @@ class WirePoint:
             None  # direction for orientation of symbols attached to endpoints
         )
         self.wires = []
-        self.net = None  # is set after DFS connects wires to nets
+        self.uf_id = None  # integer id in the canvas union-find structure
+        self.net = None  # is set once wires are connected to nets
 
 
 class Wire:
@@ -70,7 +106,6 @@ class AscCanvas():
         self.filename = None
 
         self._ensure_app()
-        self._patch_wx_clientdc()
         self._init_graphics_context()
 
         # create some graphics primitives for later use
@@ -85,24 +120,13 @@ class AscCanvas():
         self.blue_font = self.create_font(font_size, wx.BLUE)
         self.red_font = self.create_font(font_size, wx.RED)
         self.gray_font = self.create_font(font_size, wx.Colour(50, 50, 50, 50))
+        self._extent_cache = {}  # (text, size) -> GetFullTextExtent result
 
         self.reset()
 
         if symbol_paths:
             self.load_symbols(symbol_paths)
 
-    def _patch_wx_clientdc(self):
-        """Override wx.ClientDC with a MemoryDC to support headless usage."""
-
-        class _HeadlessClientDC(wx.MemoryDC):
-            def __init__(self, *args, **kwargs):
-                super().__init__()
-                self._bmp = wx.Bitmap(1, 1)
-                self.SelectObject(self._bmp)
-
-        wx.ClientDC = _HeadlessClientDC
-        symbol_module.wx.ClientDC = _HeadlessClientDC
-
     def _ensure_app(self):
         """Create a minimal wx App so that GDI objects can be instantiated."""
         if wx.App.Get() is None:
@@ -120,6 +144,7 @@ class AscCanvas():
     def reset(self):
         self.wires = []
         self.wire_points = {}
+        self._uf_parent = []  # union-find over wire-point ids, built while parsing
         self.net_counter = 0  # for auto-labeling nets
         self.flags = {}  # off-schematic connectors or io pins
         self.texts = []
@@ -128,6 +153,7 @@ class AscCanvas():
         self.nets = {}  # name to net
         self.path = self.gc.CreatePath()
         self.symbol_instances = {}
+        self._loaded_symbols = set()  # symbol names already parsed for this canvas
 
     def reset_extent(self):
         self.x1 = float("inf")
@@ -171,15 +197,30 @@ class AscCanvas():
                 self.symbols[name] = Symbol(self, f)
 
     def create_font(self, size, color=wx.BLACK):
-        return self.gc.CreateFont(
-            wx.Font(
-                int(10 * size),
+        # wx.Font is context-independent and shared across canvases via
+        # _FONT_CACHE; only the GC-bound wx.GraphicsFont is created per canvas
+        pt = int(10 * size)
+        font = _FONT_CACHE.get(pt)
+        if font is None:
+            font = wx.Font(
+                pt,
                 wx.FONTFAMILY_DEFAULT,
                 wx.FONTSTYLE_NORMAL,
                 wx.FONTWEIGHT_NORMAL,
-            ),
-            col=color,
-        )
+            )
+            _FONT_CACHE[pt] = font
+        return self.gc.CreateFont(font, col=color)
+
+    def _text_extent(self, text, size):
+        """Measures a string at a given font size, caching the result: extents
+        only depend on (text, size), not on the schematic being rendered."""
+        key = (text, size)
+        extent = self._extent_cache.get(key)
+        if extent is None:
+            self.gc.SetFont(self.fonts[size])
+            extent = self.gc.GetFullTextExtent(text)
+            self._extent_cache[key] = extent
+        return extent
 
     def align_text(self, x, y, text, align, size, rotation, morig):
         """Aligns text for presentation. It takes formatting inputs from the asc file,
@@ -187,8 +228,7 @@ class AscCanvas():
         for wx's DrawText function."""
         m = self.gc.CreateMatrix()
         m.Concat(morig)
-        self.gc.SetFont(self.fonts[size])
-        w, h, d, e = self.gc.GetFullTextExtent(text)
+        w, h, d, e = self._text_extent(text, size)
         if align[0] == "V":
             align = align[1:]
             m.Translate(x, y)
@@ -219,32 +259,27 @@ class AscCanvas():
         x2, y2 = m.TransformPoint(w, h)
         return min(x1, x2), min(y1, y2), max(y1, y2)
 
-    def connect_wires(self, wire_point):
-        """Connects wires to nets using recursion."""
-        stack = [wire_point]
-        while stack:
-            wire_point = stack.pop()
-            # check for a custom net name
-            flag = self.flags.get((wire_point.x, wire_point.y))
-            if flag:
-                assert (
-                    self.net_override is None or self.net_override == flag["net"]
-                ), f"Conflicting net names are assigned: {self.net_override} and {flag['net']}"
-                if self.net_override is None:
-                    self.net_counter -= 1
-                self.net_override = flag["net"]
-                wire_point.net.name = flag["net"]
-
-            for wire in wire_point.wires:
-                wire.net = wire_point.net
-                wire_point.net.wires.add(wire)
-                if wire_point.x == wire.x0 and wire_point.y == wire.y0:
-                    neighbor = self.wire_points.get((wire.x1, wire.y1))
-                else:
-                    neighbor = self.wire_points.get((wire.x0, wire.y0))
-                if neighbor.net is None:
-                    neighbor.net = wire_point.net
-                    stack.append(neighbor)
+    def _ensure_loaded(self, name):
+        """Parses a symbol's asy file at most once per canvas, however many
+        instances of it the schematic contains."""
+        if name not in self._loaded_symbols:
+            self.symbols[name].load()
+            self._loaded_symbols.add(name)
+
+    def _uf_find(self, i):
+        """Finds the union-find root of a wire-point id, with path halving."""
+        parent = self._uf_parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _uf_union(self, a, b):
+        """Merges the components of two wire-point ids."""
+        ra = self._uf_find(a)
+        rb = self._uf_find(b)
+        if ra != rb:
+            self._uf_parent[rb] = ra
 
     def load_asc(self, filename):
         """Loads an LtSpice schematic from the given filename."""
@@ -252,50 +287,86 @@ class AscCanvas():
         self.filename = filename
         self.reset()
         self.reset_extent()
-        f = open(filename, encoding="iso-8859-1")
+        with open(filename, encoding="iso-8859-1") as f:
+            text = f.read()
+
+        # WIRE lines are extracted in one regex pass with int conversion done
+        # in C; the wire extent collapses to two vector reductions instead of
+        # one check_extent call per line
+        wires_arr = np.array(_WIRE_RE.findall(text), dtype=np.int32).reshape(-1, 4)
+        endpoint_ids = np.empty((0, 2), dtype=np.intp)
+        point_list = []
+        if len(wires_arr):
+            self._update_bounds(
+                int(wires_arr[:, [0, 2]].min()), int(wires_arr[:, [1, 3]].min())
+            )
+            self._update_bounds(
+                int(wires_arr[:, [0, 2]].max()), int(wires_arr[:, [1, 3]].max())
+            )
+
+            # dedupe endpoints in one np.unique call on packed int64 keys
+            # instead of one dict probe per endpoint; ids are remapped to
+            # first-encounter order so net numbering stays unchanged
+            endpoints = wires_arr.reshape(-1, 2)
+            keys = (endpoints[:, 0].astype(np.int64) << 32) | (
+                endpoints[:, 1].astype(np.int64) & 0xFFFFFFFF
+            )
+            _, first_idx, inv = np.unique(keys, return_index=True, return_inverse=True)
+            order = np.argsort(first_idx)
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            endpoint_ids = rank[inv].reshape(-1, 2)
+
+            for px, py in endpoints[first_idx[order]].tolist():
+                wire_point = WirePoint(px, py)
+                wire_point.uf_id = len(point_list)
+                self.wire_points[(px, py)] = wire_point
+                point_list.append(wire_point)
+            self._uf_parent = list(range(len(point_list)))
+
+        for (x0, y0, x1, y1), (id0, id1) in zip(
+            wires_arr.tolist(), endpoint_ids.tolist()
+        ):
+            wire = Wire(x0, y0, x1, y1)
+            self.wires.append(wire)
+
+            # determine direction of wire ends that is used for some connector
+            # symbols and ground; default direction at wire end is down
+            wire_point0 = point_list[id0]
+            wire_point1 = point_list[id1]
+            wire_point0.wires.append(wire)
+            wire_point1.wires.append(wire)
+            # both endpoints belong to the same net
+            self._uf_union(wire_point0.uf_id, wire_point1.uf_id)
+            if wire.x0 == wire.x1:  # vertical
+                if wire.y0 < wire.y1:
+                    wire_point0.direction = 2  # top
+                else:
+                    wire_point1.direction = 2
+            if wire.y0 == wire.y1:  # horizontal
+                if wire.x0 < wire.x1:
+                    wire_point0.direction = 1  # left
+                    wire_point1.direction = 3
+                else:
+                    wire_point0.direction = 3  # right
+                    wire_point1.direction = 1
+
+            min_x, min_y = min(wire.x0, wire.x1), min(
+                wire.y0, wire.y1
+            )  # rtree lib needs a well-formed rect
+            max_x, max_y = max(wire.x0, wire.x1), max(wire.y0, wire.y1)
+            rect = rt.Rect(min_x, min_y, max_x + 1, max_y + 1)
+            self.wire_lookup.insert(wire, rect)
+
         sheet_w, sheet_h = 0, 0
-        for line in f:
+        for line in text.splitlines():
             line = line.strip()
             if len(line) == 0:
                 continue
             words = line.split(" ")
             if words[0] == "WIRE":
-                wire = Wire(*[int(x) for x in words[1:]])
-                self.check_extent([wire.x0, wire.x1], [wire.y0, wire.y1])
-                self.wires.append(wire)
-
-                # save endpoints and determine direction of wire ends that is used for some connector symbols and ground
-                # default direction at wire end is down
-                wire_point0 = self.wire_points.get((wire.x0, wire.y0))
-                if wire_point0 is None:
-                    wire_point0 = WirePoint(wire.x0, wire.y0)
-                    self.wire_points[(wire.x0, wire.y0)] = wire_point0
-                wire_point1 = self.wire_points.get((wire.x1, wire.y1))
-                if wire_point1 is None:
-                    wire_point1 = WirePoint(wire.x1, wire.y1)
-                    self.wire_points[(wire.x1, wire.y1)] = wire_point1
-                wire_point0.wires.append(wire)
-                wire_point1.wires.append(wire)
-                if wire.x0 == wire.x1:  # vertical
-                    if wire.y0 < wire.y1:
-                        wire_point0.direction = 2  # top
-                    else:
-                        wire_point1.direction = 2
-                if wire.y0 == wire.y1:  # horizontal
-                    if wire.x0 < wire.x1:
-                        wire_point0.direction = 1  # left
-                        wire_point1.direction = 3
-                    else:
-                        wire_point0.direction = 3  # right
-                        wire_point1.direction = 1
-
-                min_x, min_y = min(wire.x0, wire.x1), min(
-                    wire.y0, wire.y1
-                )  # rtree lib needs a well-formed rect
-                max_x, max_y = max(wire.x0, wire.x1), max(wire.y0, wire.y1)
-                rect = rt.Rect(min_x, min_y, max_x + 1, max_y + 1)
-                self.wire_lookup.insert(wire, rect)
-            elif words[0] == "TEXT":
+                continue  # already parsed above
+            if words[0] == "TEXT":
                 x = int(words[1])
                 y = int(words[2])
                 align = words[3]
@@ -338,7 +409,7 @@ class AscCanvas():
                 # load default attrs from symbol file
                 symbol = self.symbols.get(words[1])
                 assert symbol, f"Unknown symbol {words[1]}"
-                symbol.load()
+                self._ensure_loaded(words[1])
                 instance.attrs = symbol.attrs.copy()
             elif words[0] == "WINDOW":
                 x = int(words[2])
@@ -365,7 +436,7 @@ class AscCanvas():
                     ),
                 )
                 continue
-            s.load()
+            self._ensure_loaded(instance.name)
             instance.set_symbol(s)
             for pin in instance.pins:
                 pin_positions[(pin.x, pin.y)] = (instance, pin)
@@ -387,17 +458,38 @@ class AscCanvas():
                 [instance.y + s.y1, instance.y + s.y2],
             )
 
-        # connect wires to pins
+        # connect wires to nets: one union-find pass instead of a DFS per component
+        flags_by_root = {}
+        for (fx, fy), flag in self.flags.items():
+            wp = self.wire_points.get((fx, fy))
+            if wp is not None:
+                flags_by_root.setdefault(self._uf_find(wp.uf_id), []).append(flag)
+
+        nets_by_root = {}
         for wire_point in self.wire_points.values():
-            if wire_point.net:
-                continue
-            self.net_counter += 1
-            wire_point.net = Net(f"N{self.net_counter:03d}")
-            self.nets[wire_point.net.name] = wire_point.net
-            self.net_override = (
-                None  # is set to net name if a user-assigned net name is found
-            )
-            self.connect_wires(wire_point)
+            root = self._uf_find(wire_point.uf_id)
+            net = nets_by_root.get(root)
+            if net is None:
+                self.net_counter += 1
+                net = Net(f"N{self.net_counter:03d}")
+                self.nets[net.name] = net
+                # apply a user-assigned net name if one is flagged on this component
+                net_override = None
+                for flag in flags_by_root.get(root, ()):
+                    assert (
+                        net_override is None or net_override == flag["net"]
+                    ), f"Conflicting net names are assigned: {net_override} and {flag['net']}"
+                    if net_override is None:
+                        self.net_counter -= 1
+                    net_override = flag["net"]
+                    net.name = flag["net"]
+                nets_by_root[root] = net
+            wire_point.net = net
+
+        for wire in self.wires:
+            net = self.wire_points[(wire.x0, wire.y0)].net
+            wire.net = net
+            net.wires.add(wire)
 
         # calculate correct pin index from SpiceOrder
 
@@ -446,23 +538,14 @@ class AscCanvas():
         for flag in self.flags.values():
             x1, y1 = flag["x"], flag["y"]
             if flag["type"] == "In":
-                path = self.gc.CreatePath()
-                path.MoveToPoint(x1, y1)
-                path.AddLineToPoint(x1 + 10, y1 + 10)
-                path.AddLineToPoint(x1 + 10, y1 + 20)
-                path.AddLineToPoint(x1 - 10, y1 + 20)
-                path.AddLineToPoint(x1 - 10, y1 + 10)
-                path.AddLineToPoint(x1, y1)
+                direction = 0
                 wire_point = self.wire_points.get((x1, y1))
-                if wire_point and len(wire_point.wires) == 1:
+                if wire_point and len(wire_point.wires) == 1 and wire_point.direction:
                     direction = wire_point.direction
-                    if direction:
-                        m = self.gc.CreateMatrix()
-                        m.Translate(x1, y1)
-                        m.Rotate(math.pi / 2 * direction)
-                        m.Translate(-x1, -y1)
-                        path.Transform(m)
-                self.path.AddPath(path)
+                points = _IN_FLAG_POINTS[direction % 4]
+                self.path.MoveToPoint(x1 + points[0][0], y1 + points[0][1])
+                for dx, dy in points[1:]:
+                    self.path.AddLineToPoint(x1 + dx, y1 + dy)
             elif flag["type"] == "Out":
                 pass
             elif flag["type"] == "BiDir":
@@ -512,14 +595,19 @@ class AscCanvas():
 
         dc.SelectObject(wx.NullBitmap)
         img = bmp.ConvertToImage()
-        
-        # Save to temporary location first
-        temp_file = filename + ".tmp.png"
-        img.SaveFile(temp_file, wx.BITMAP_TYPE_PNG)
+
+        # Hand the raw pixels straight to PIL: no temp file and no PNG
+        # encode+decode just to move bytes between wx and PIL
+        pil_image = Image.frombuffer(
+            "RGB",
+            (img.GetWidth(), img.GetHeight()),
+            bytes(img.GetData()),
+            "raw", "RGB", 0, 1,
+        )
 
         # Crop to content and add padding
         resized_image = self.crop_to_content_and_pad(
-            temp_file,
+            pil_image,
             padding=padding,
             pad_color=background_color
         )
@@ -528,8 +616,6 @@ class AscCanvas():
         if filename:
             resized_image.save(filename)
 
-        # Delete temporary file
-        os.remove(temp_file)
         return img, filename
 
     
@@ -544,7 +630,7 @@ class AscCanvas():
         Crop an image tightly around its content and add padding.
 
         Parameters:
-        - image_path: str, input image path
+        - image_path: str input image path, or a PIL Image
         - output_path: str or None
         - padding: int, pixels added around content
         - bg_tolerance: int, tolerance for background detection
@@ -554,29 +640,38 @@ class AscCanvas():
         - PIL Image object
         """
 
-        img = Image.open(image_path).convert("RGB")
+        if isinstance(image_path, Image.Image):
+            img = image_path.convert("RGB")
+        else:
+            img = Image.open(image_path).convert("RGB")
         arr = np.array(img)
 
-        # Estimate background color from corners
-        corners = np.array([
-            arr[0, 0],
-            arr[0, -1],
-            arr[-1, 0],
-            arr[-1, -1]
-        ])
-        bg_color = np.mean(corners, axis=0)
+        # Estimate background color from the four corner pixels with plain
+        # integer arithmetic, skipping the tiny intermediate corner array
+        c00, c01, c10, c11 = arr[0, 0], arr[0, -1], arr[-1, 0], arr[-1, -1]
+        bg_color = tuple(
+            (int(c00[k]) + int(c01[k]) + int(c10[k]) + int(c11[k]) + 2) // 4
+            for k in range(3)
+        )
 
-        # Compute mask of non-background pixels
-        diff = np.abs(arr - bg_color)
-        mask = np.any(diff > bg_tolerance, axis=2)
+        # Compute mask of non-background pixels. Stay in int16 (uint8 minus
+        # uint8 fits) instead of promoting the whole image to float64, and
+        # reduce to per-row/per-column flags instead of materializing the
+        # coordinates of every content pixel.
+        diff = np.subtract(arr, bg_color, dtype=np.int16)
+        np.abs(diff, out=diff)
+        mask = (diff > bg_tolerance).any(axis=2)
 
-        coords = np.column_stack(np.where(mask))
+        mask_rows = mask.any(axis=1)
+        mask_cols = mask.any(axis=0)
 
-        if coords.size == 0:
+        if not mask_rows.any():
             raise ValueError("No content detected")
 
-        y_min, x_min = coords.min(axis=0)
-        y_max, x_max = coords.max(axis=0)
+        y_min = int(np.argmax(mask_rows))
+        y_max = len(mask_rows) - 1 - int(np.argmax(mask_rows[::-1]))
+        x_min = int(np.argmax(mask_cols))
+        x_max = len(mask_cols) - 1 - int(np.argmax(mask_cols[::-1]))
 
         # Crop to content
         cropped = img.crop((x_min, y_min, x_max + 1, y_max + 1))
@@ -1,5 +1,21 @@
+import contextlib
+import gc
+
 import torch
-from transformers import T5Tokenizer, T5ForConditionalGeneration
+from transformers import T5TokenizerFast, T5ForConditionalGeneration
+
+
+@contextlib.contextmanager
+def no_gc():
+    """Désactive le ramasse-miettes pendant le bloc : la génération alloue
+    beaucoup d'objets temporaires et une pause GC au milieu ajoute une latence
+    imprévisible. Une collecte est déclenchée explicitement en sortie."""
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.collect()
+        gc.enable()
 
 # ==============================================================================
 # CONFIGURATION DU MODÈLE
@@ -13,7 +29,8 @@ print(f"Téléchargement/Chargement du modèle '{model_id}' depuis Hugging Face.
 # 2. Charger le Tokenizer et le Modèle
 try:
     # Cela va chercher le modèle sur le cloud automatiquement
-    tokenizer = T5Tokenizer.from_pretrained(model_id)
+    # (tokenizer "fast" en Rust : encodage/décodage bien plus rapide)
+    tokenizer = T5TokenizerFast.from_pretrained(model_id)
     model = T5ForConditionalGeneration.from_pretrained(model_id)
 except Exception as e:
     print(f"Erreur lors du chargement : {e}")
@@ -23,6 +40,25 @@ except Exception as e:
 # Passer le modèle sur GPU s'il est disponible pour aller plus vite
 device = "cuda" if torch.cuda.is_available() else "cpu"
 model = model.to(device)
+if device == "cuda":
+    # FP16 sur GPU : moitié moins d'octets à déplacer pendant la beam search
+    model = model.half()
+model.eval()
+
+# Attention fusionnée (SDPA) via BetterTransformer si optimum est installé :
+# même calcul, beaucoup moins de trafic mémoire dans l'encodeur.
+# transform() lui-même peut échouer (NotImplementedError pour les architectures
+# à biais d'attention relatif comme T5, API dépréciée sur les optimum récents) :
+# dans tous ces cas on garde l'attention standard au lieu de planter
+try:
+    from optimum.bettertransformer import BetterTransformer
+except ImportError:
+    pass  # optimum absent : on garde l'attention standard
+else:
+    try:
+        model = BetterTransformer.transform(model)
+    except Exception as e:
+        print(f"BetterTransformer indisponible pour ce modèle ({e}), attention standard conservée.")
 
 print("Modèle chargé avec succès !\n")
 
@@ -30,30 +66,59 @@ print("Modèle chargé avec succès !\n")
 # FONCTION DE GÉNÉRATION
 # ==============================================================================
 
+# Cache des netlists déjà générées, clé = description brute.
+# Une description identique (ex: re-clic sur un exemple) revient instantanément.
+_SPICE_CACHE = {}
+_SPICE_CACHE_MAX = 256
+
 def generate_spice(text_description):
     """
-    Traduit une description textuelle en Netlist SPICE.
+    Traduit une description textuelle (ou une liste de descriptions) en
+    Netlist SPICE. Les listes sont traitées en un seul appel à generate :
+    le surcoût fixe (lancements de kernels, transitions Python->C) est
+    amorti sur tout le batch.
     """
-    # Préparation de l'entrée
+    is_batch = isinstance(text_description, (list, tuple))
+    texts = list(text_description) if is_batch else [text_description]
+
+    if not is_batch and text_description in _SPICE_CACHE:
+        return _SPICE_CACHE[text_description]
+
+    # Préparation de l'entrée (padding au plus long du batch)
     inputs = tokenizer(
-        text_description, 
-        return_tensors="pt", 
-        padding=True, 
-        truncation=True, 
+        texts,
+        return_tensors="pt",
+        padding=True,
+        truncation=True,
         max_length=512
     ).to(device)
 
-    # Génération
-    outputs = model.generate(
-        inputs.input_ids,
-        max_length=200,
-        num_beams=5, 
-        early_stopping=True
-    )
+    # Génération (inference_mode : pas de comptabilité autograd, plus léger que no_grad)
+    with no_gc(), torch.inference_mode():
+        # L'encodeur ne tourne qu'une seule fois ; la beam search réutilise ses
+        # états via encoder_outputs + KV-cache au lieu de les recalculer
+        enc = model.encoder(
+            input_ids=inputs.input_ids,
+            attention_mask=inputs.attention_mask,
+            return_dict=True
+        )
+        outputs = model.generate(
+            encoder_outputs=enc,
+            attention_mask=inputs.attention_mask,
+            max_length=200,
+            num_beams=4,      # 4 faisceaux suffisent pour des netlists courtes et structurées
+            do_sample=False,
+            use_cache=True,
+            early_stopping=True
+        )
 
     # Décodage (transformer les tokens en texte)
-    result = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    return result
+    results = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+    if not is_batch:
+        if len(_SPICE_CACHE) >= _SPICE_CACHE_MAX:
+            _SPICE_CACHE.clear()  # borne la mémoire, au pire on regénère
+        _SPICE_CACHE[text_description] = results[0]
+    return results if is_batch else results[0]
 
 # ==============================================================================
 # ZONE DE TEST